@@ -9,31 +9,57 @@ except ImportError:
     USE_GEVENT = False
     print('⚠ gevent not found — running in dev mode (no async)')
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    print('⚠ orjson not found — falling back to stdlib json')
+
 from flask import Flask, request, Response, send_file, send_from_directory
 import os
-import yaml
+import io
+import zlib
 import csv
 import json
 import threading
 import signal
 import sys
+import time
+from collections import OrderedDict, defaultdict
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
-config_path = os.path.join(script_dir, '..', 'config.yaml')
-
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
+from modules import config, REPO_ROOT, ENCODING
 
 HOST = config['DASHBOARD']['HOST']
 PORT = config['DASHBOARD']['PORT']
 SAVE_FILE = config['DASHBOARD']['SAVE_FILE']
-ENCODING = config['ENCODING']
 ROUTE = config['ROUTES']['update_dashboard']
-REPO_ROOT = os.path.normpath(os.path.join(script_dir, '..'))
+SAVE_PATH = os.path.join(REPO_ROOT, 'DATA', SAVE_FILE)
+TMP_PATH = SAVE_PATH + '.tmp'
+DASHBOARD_DIR = os.path.join(REPO_ROOT, 'DASHBOARD')
+INDEX_HTML = os.path.join(DASHBOARD_DIR, 'index.html')
+VERSION_CHECK_JS = os.path.join(DASHBOARD_DIR, 'version-check.js')
+VERSION_MD = os.path.join(REPO_ROOT, 'version.md')
+FAVICON_ICO = os.path.join(DASHBOARD_DIR, 'favicon.ico')
+ROBOTS_TXT = os.path.join(DASHBOARD_DIR, 'robots.txt')
 CSV_HEADERS = ['ORG_ID', 'PC_ID', 'PORT_ID', 'PORT_MAP', 'PORT_STATUS', 'PORT_NAME']
+ORG_IDX, PC_IDX = 0, 1
 
 app = Flask(__name__, static_folder=None)
 
+# jsonify()/request.get_json() across all blueprints go through orjson
+# instead of stdlib json when it is available
+if orjson is not None:
+    from flask.json.provider import DefaultJSONProvider
+
+    class ORJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = ORJSONProvider(app)
+
 # Register blueprints
 from modules.auth import auth_bp
 from modules.zip_builder import zip_bp
@@ -55,7 +81,24 @@ def add_no_cache_headers(response):
 # SSE clients by organization
 sse_clients_by_org = {}
 sse_lock = threading.Lock()
-file_lock = threading.Lock()
+
+# Lock striping by ORG_ID: updates touching different orgs don't contend.
+# writer_lock only serializes snapshot writers (writer thread vs shutdown).
+# Under gevent, monkey.patch_all() at the top of this file has already
+# replaced threading primitives, so these are greenlet locks — no OS futex.
+N_LOCK_STRIPES = 32
+_stripe_locks = [threading.RLock() for _ in range(N_LOCK_STRIPES)]
+writer_lock = threading.Lock()
+
+def _acquire_stripes(stripe_ids):
+    for i in stripe_ids:
+        _stripe_locks[i].acquire()
+
+def _release_stripes(stripe_ids):
+    for i in reversed(stripe_ids):
+        _stripe_locks[i].release()
+
+ALL_STRIPES = tuple(range(N_LOCK_STRIPES))
 
 def _add_sse_client(org_id: str, client_queue) -> None:
     with sse_lock:
@@ -71,66 +114,214 @@ def _remove_sse_client(org_id: str, client_queue) -> None:
             if not sse_clients_by_org[org_id]:
                 del sse_clients_by_org[org_id]
 
-def read_csv_as_json(org_id: str | None = None) -> dict:
-    save_path = os.path.join(REPO_ROOT, 'DATA', SAVE_FILE)
-    if not os.path.exists(save_path):
-        return {'headers': [], 'rows': []}
+# In-memory CSV index: all reads are served from here, the file on disk
+# is only a persistence snapshot rewritten after updates.
+STATE = {
+    'rows': OrderedDict(),               # (org_id, pc_id) -> list of port rows
+    'by_org': defaultdict(OrderedDict),  # org_id -> (org_id, pc_id) -> list of port rows
+}
+
+def _load_state() -> None:
+    if not os.path.exists(SAVE_PATH):
+        return
     try:
-        with file_lock:
-            with open(save_path, 'r', encoding=ENCODING) as f:
-                rows = list(csv.reader(f))
-    except Exception:
-        return {'headers': [], 'rows': []}
-    if not rows:
-        return {'headers': [], 'rows': []}
-    headers, data_rows = rows[0], rows[1:]
+        with open(SAVE_PATH, 'r', encoding=ENCODING) as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            for row in reader:
+                if not row:
+                    continue
+                STATE['rows'].setdefault((row[0], row[1]), []).append(row)
+    except Exception as e:
+        print(f'Error loading {SAVE_FILE}: {e}')
+        return
+    for key, rows in STATE['rows'].items():
+        STATE['by_org'][key[0]][key] = rows
+
+_load_state()
+
+def _persist_state() -> None:
+    """Atomically rewrite SAVE_FILE from the index."""
+    with writer_lock:
+        # Serialize the whole snapshot in memory first so the tmp file is
+        # written with a single write syscall instead of one per row, and
+        # so no stripe lock is held during disk I/O.
+        _acquire_stripes(ALL_STRIPES)
+        try:
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(CSV_HEADERS)
+            for rows in STATE['rows'].values():
+                writer.writerows(rows)
+        finally:
+            _release_stripes(ALL_STRIPES)
+        fd = os.open(TMP_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, buf.getvalue().encode(ENCODING))
+        finally:
+            os.close(fd)
+        os.replace(TMP_PATH, SAVE_PATH)
+
+# Coalescing writer: POSTs only push a token, a single background thread
+# batches updates arriving within the flush window into one snapshot write.
+FLUSH_INTERVAL_SECONDS = 0.02
+write_queue = Queue()
+
+def _writer_loop() -> None:
+    while True:
+        write_queue.get()
+        time.sleep(FLUSH_INTERVAL_SECONDS)
+        try:
+            while True:
+                write_queue.get_nowait()
+        except Empty:
+            pass
+        try:
+            _persist_state()
+        except Exception as e:
+            print(f'Error persisting {SAVE_FILE}: {e}')
+
+threading.Thread(target=_writer_loop, daemon=True).start()
+
+def read_csv_as_json(org_id: str | None = None) -> dict:
     if org_id:
-        data_rows = [row for row in data_rows if row and row[0] == org_id]
-    return {'headers': headers, 'rows': data_rows}
+        # Lock-free read: update_dashboard swaps in a fresh per-org dict
+        # (copy-on-write) rather than mutating the one readers may hold,
+        # so grabbing the reference is an atomic pointer load under the GIL.
+        org_map = STATE['by_org'].get(org_id) or {}
+        rows = [row for rows in org_map.values() for row in rows]
+    else:
+        _acquire_stripes(ALL_STRIPES)
+        try:
+            rows = [row for rows in STATE['rows'].values() for row in rows]
+        finally:
+            _release_stripes(ALL_STRIPES)
+    return {'headers': CSV_HEADERS, 'rows': rows}
 
-def notify_clients(changed_org_ids: set[str]) -> None:
-    with sse_lock:
-        for org_id in changed_org_ids:
-            if org_id not in sse_clients_by_org:
-                continue
-            data = read_csv_as_json(org_id)
-            message = f"data: {json.dumps(data)}\n\n"
-            dead_clients = []
-            for client in sse_clients_by_org[org_id]:
+# Serialized SSE payload cache: org_id -> (version, message). update_dashboard
+# bumps the version so the snapshot is rebuilt at most once per change.
+payload_version = defaultdict(int)
+payload_cache = {}
+
+def _encode_sse(data) -> bytes:
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data).encode(ENCODING)
+    return b'data: ' + body + b'\n\n'
+
+def build_payload(org_id: str) -> bytes:
+    """Full snapshot message, sent on (re)connect."""
+    # /sse is unauthenticated and org_id is client-chosen: only orgs that
+    # actually have data get payload_version/payload_cache entries, so
+    # made-up ids can't grow either mapping without bound. Once the org's
+    # first upload lands, caching picks up as normal.
+    if org_id not in STATE['by_org']:
+        return _encode_sse({'type': 'snapshot', 'version': 0,
+                            'headers': CSV_HEADERS, 'rows': []})
+    version = payload_version[org_id]
+    cached = payload_cache.get(org_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    data = read_csv_as_json(org_id)
+    message = _encode_sse({'type': 'snapshot', 'version': version,
+                           'headers': data['headers'], 'rows': data['rows']})
+    payload_cache[org_id] = (version, message)
+    return message
+
+# Per-client queues are bounded so a stalled consumer holds O(1) memory.
+# On overflow the backlog is dropped and a resync sentinel is queued: the
+# client then gets one fresh snapshot instead of a pile of stale patches.
+SSE_QUEUE_MAXSIZE = 16
+_RESYNC = object()
+
+def notify_clients(changed_rows_by_org: dict[str, list]) -> None:
+    for org_id, rows in changed_rows_by_org.items():
+        with sse_lock:
+            clients = list(sse_clients_by_org.get(org_id, ()))
+        if not clients:
+            continue
+        # Connected dashboards only get the rows that changed; the full
+        # dataset is re-sent as a snapshot only on reconnect.
+        message = _encode_sse({'type': 'patch', 'version': payload_version[org_id], 'rows': rows})
+        for client in clients:
+            try:
+                client.put_nowait(message)
+            except Full:
+                try:
+                    while True:
+                        client.get_nowait()
+                except Empty:
+                    pass
                 try:
-                    client.put_nowait(message)
-                except (Full, Exception):
-                    dead_clients.append(client)
-            for client in dead_clients:
-                sse_clients_by_org[org_id].remove(client)
+                    client.put_nowait(_RESYNC)
+                except Full:
+                    pass
+
+# Cap on the decompressed upload size: the endpoint is unauthenticated and
+# gzip deflates repetitive CSV ~1000x, so a kilobyte-scale bomb must not be
+# allowed to expand freely into process memory
+MAX_DECOMPRESSED_BYTES = 10 * 1024 * 1024
+
+def _gunzip_limited(raw: bytes) -> bytes:
+    """Decompress a gzip body, refusing to produce more than the cap."""
+    d = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)  # gzip container
+    out = d.decompress(raw, MAX_DECOMPRESSED_BYTES + 1)
+    if len(out) > MAX_DECOMPRESSED_BYTES or d.unconsumed_tail:
+        raise ValueError('decompressed body too large')
+    if not d.eof:
+        raise zlib.error('truncated gzip body')
+    return out
 
 @app.route(ROUTE, methods=['POST'])
 def update_dashboard():
-    csv_content = request.get_data(as_text=True)
-    save_path = os.path.join(REPO_ROOT, 'DATA', SAVE_FILE)
-    tmp_path = save_path + '.tmp'
-    lines = csv_content.strip().split('\n')
-    if not lines:
+    raw = request.get_data()
+    if request.headers.get('Content-Encoding') == 'gzip':
+        try:
+            raw = _gunzip_limited(raw)
+        except ValueError:
+            return 'Decompressed body too large', 413
+        except (OSError, EOFError, zlib.error):
+            return 'Bad gzip body', 400
+    if not raw:
         return 'Empty data', 400
-    reader = csv.DictReader(lines)
-    new_rows = list(reader)
+    # Stream the body through the csv reader — no decoded copy, no line list
+    stream = io.TextIOWrapper(io.BytesIO(raw), encoding=ENCODING, errors='replace', newline='')
+    reader = csv.reader(stream)
+    next(reader, None)  # header
+    # Drop malformed short rows instead of 500ing on row[PC_IDX] — this
+    # endpoint is unauthenticated and agents can send partial uploads
+    new_rows = [row for row in reader if len(row) >= len(CSV_HEADERS)]
     if not new_rows:
         return 'No data rows', 400
-    new_keys = set((row['ORG_ID'], row['PC_ID']) for row in new_rows)
-    with file_lock:
-        existing_rows = []
-        if os.path.exists(save_path):
-            with open(save_path, 'r', encoding=ENCODING) as f:
-                existing_rows = list(csv.DictReader(f))
-        kept_rows = [row for row in existing_rows if (row['ORG_ID'], row['PC_ID']) not in new_keys]
-        merged_rows = kept_rows + new_rows
-        with open(tmp_path, 'w', newline='', encoding=ENCODING) as f:
-            writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-            writer.writeheader()
-            writer.writerows(merged_rows)
-        os.replace(tmp_path, save_path)
-    print(f'CSV merged: kept {len(kept_rows)} rows, added {len(new_rows)} rows')
-    notify_clients(set(row['ORG_ID'] for row in new_rows))
+    # Group posted rows per machine: each POST replaces all rows of its (ORG_ID, PC_ID)
+    grouped = {}
+    for row in new_rows:
+        grouped.setdefault((row[ORG_IDX], row[PC_IDX]), []).append(row)
+    changed_rows_by_org = {}
+    for key, rows in grouped.items():
+        changed_rows_by_org.setdefault(key[ORG_IDX], []).extend(rows)
+    changed_orgs = set(changed_rows_by_org)
+    stripe_ids = sorted({hash(org_id) & (N_LOCK_STRIPES - 1) for org_id in changed_orgs})
+    _acquire_stripes(stripe_ids)
+    try:
+        for key, rows in grouped.items():
+            STATE['rows'][key] = rows
+        # Copy-on-write per org: build the updated map aside and swap it in
+        # with one assignment so concurrent SSE reads never observe a dict
+        # mid-mutation and never need a lock (RCU-style snapshot).
+        for org_id in changed_orgs:
+            org_map = OrderedDict(STATE['by_org'].get(org_id) or ())
+            for key, rows in grouped.items():
+                if key[ORG_IDX] == org_id:
+                    org_map[key] = rows
+            STATE['by_org'][org_id] = org_map
+            payload_version[org_id] += 1
+    finally:
+        _release_stripes(stripe_ids)
+    write_queue.put(True)
+    print(f'CSV updated: {len(new_rows)} rows for {len(grouped)} machine(s)')
+    notify_clients(changed_rows_by_org)
     return 'OK', 200
 
 @app.route('/sse')
@@ -138,19 +329,21 @@ def sse():
     org_id = request.args.get('org_id', '').strip()
     if not org_id:
         return 'org_id required', 400
-    client_queue = Queue()
+    client_queue = Queue(maxsize=SSE_QUEUE_MAXSIZE)
     _add_sse_client(org_id, client_queue)
 
     def generate():
-        data = read_csv_as_json(org_id)
-        yield f"data: {json.dumps(data)}\n\n"
+        yield build_payload(org_id)
         try:
             while True:
                 try:
                     message = client_queue.get(timeout=5)
-                    yield message
+                    if message is _RESYNC:
+                        yield build_payload(org_id)
+                    else:
+                        yield message
                 except Empty:
-                    yield ": heartbeat\n\n"
+                    yield b': heartbeat\n\n'
         finally:
             _remove_sse_client(org_id, client_queue)
 
@@ -160,30 +353,34 @@ def sse():
 # Static routes
 @app.route('/static/<path:subpath>')
 def serve_static(subpath):
-    return send_from_directory(os.path.join(REPO_ROOT, 'DASHBOARD'), subpath)
+    return send_from_directory(DASHBOARD_DIR, subpath, conditional=True)
 
 @app.route('/')
 def index():
-    return send_file(os.path.join(REPO_ROOT, 'DASHBOARD', 'index.html'))
+    return send_file(INDEX_HTML, conditional=True)
 
 @app.route('/version-check.js')
 def version_check_js():
-    return send_file(os.path.join(REPO_ROOT, 'DASHBOARD', 'version-check.js'))
+    return send_file(VERSION_CHECK_JS, conditional=True)
 
 @app.route('/version.md')
 def version_md():
-    return send_file(os.path.join(REPO_ROOT, 'version.md'))
+    return send_file(VERSION_MD, conditional=True)
 
 @app.route('/favicon.ico')
 def favicon():
-    return send_file(os.path.join(REPO_ROOT, 'DASHBOARD', 'favicon.ico'))
+    return send_file(FAVICON_ICO, conditional=True, max_age=3600)
 
 @app.route('/robots.txt')
 def robots():
-    return send_file(os.path.join(REPO_ROOT, 'DASHBOARD', 'robots.txt'))
+    return send_file(ROBOTS_TXT, conditional=True, max_age=3600)
 
 if __name__ == '__main__':
     def _shutdown():
+        try:
+            _persist_state()
+        except Exception as e:
+            print(f'Error persisting {SAVE_FILE}: {e}')
         print('\nServer stopped by user')
         sys.exit(0)
 
@@ -195,4 +392,9 @@ if __name__ == '__main__':
 
     print(f'Server running on http://{HOST}:{PORT}')
     print(f'Dashboard: http://localhost:{PORT}/')
-    app.run(host=HOST, port=PORT, threaded=True)
+    if USE_GEVENT:
+        # Same worker model as the gunicorn gevent class used in production
+        from gevent.pywsgi import WSGIServer
+        WSGIServer((HOST, PORT), app).serve_forever()
+    else:
+        app.run(host=HOST, port=PORT, threaded=True)
@@ -28,6 +28,17 @@ const logout = () => {
 // ==================== Table Rendering ====================
 
 let tableData = { headers: [], rows: [] }, sortCol = 4, sortAsc = true;
+let machines = new Map(); // "ORG_ID|PC_ID" -> rows of that machine
+
+const applyRows = rows => {
+    const groups = new Map();
+    rows.forEach(r => {
+        const key = `${r[0]}|${r[1]}`;
+        if (!groups.has(key)) groups.set(key, []);
+        groups.get(key).push(r);
+    });
+    groups.forEach((v, k) => machines.set(k, v));
+};
 
 const render = () => {
     const rows = [...tableData.rows];
@@ -67,8 +78,14 @@ const startSSE = () => {
         $('status').textContent = new Date().toLocaleTimeString('ru');
     };
     es.onmessage = e => {
-        tableData = JSON.parse(e.data);
-        const empty = !tableData.headers.length;
+        const msg = JSON.parse(e.data);
+        if (msg.type === 'snapshot') {
+            tableData.headers = msg.headers;
+            machines = new Map();
+        }
+        applyRows(msg.rows);
+        tableData.rows = [...machines.values()].flat();
+        const empty = !tableData.rows.length;
         $('data-table').style.display = empty ? 'none' : 'table';
         $('empty-message').style.display = empty ? 'block' : 'none';
         if (!empty) render();
@@ -3,6 +3,7 @@ Security Layer - Installer
 Sets up USB monitoring system on target machine
 """
 
+import atexit
 import subprocess
 import sys
 import winreg
@@ -25,13 +26,24 @@ AUTOSTART_KEY = r"Software\Microsoft\Windows\CurrentVersion\Run"
 AUTOSTART_NAME = "SecurityLayerAgent"
 
 
+# Log file is opened once, line-buffered, and reused for every message;
+# atexit closes it so the last lines are flushed even on sys.exit()
+_log_file = None
+
+def _get_log_file():
+    global _log_file
+    if _log_file is None:
+        _log_file = open(LOG_FILE, 'a', buffering=1, encoding='utf-8')
+        atexit.register(_log_file.close)
+    return _log_file
+
+
 def log_message(message, level="INFO"):
     """Write timestamped message to log file and console"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     log_entry = f"[{timestamp}] [{level}] [INSTALL] {message}"
     try:
-        with open(LOG_FILE, 'a', encoding='utf-8') as f:
-            f.write(log_entry + '\n')
+        _get_log_file().write(log_entry + '\n')
     except Exception:
         pass
     print(log_entry)
@@ -45,24 +57,40 @@ def check_python_version():
     return False
 
 
-def ensure_package(name, min_version):
-    """Check if package exists, install if missing"""
+def ensure_packages(packages):
+    """Check which packages are missing and install them with one pip run"""
+    # Metadata lookup instead of __import__: no module initialization cost,
+    # and no pip process at all on the common everything-installed path
+    from importlib.metadata import version, PackageNotFoundError
+    from importlib.util import find_spec
+    missing = []
+    for name, min_version in packages:
+        try:
+            version(name)
+        except PackageNotFoundError:
+            # No dist-info doesn't mean absent: bundled interpreters ship
+            # some modules under a different distribution (wmi comes from
+            # PyMI), so fall back to importability before involving pip
+            if find_spec(name) is None:
+                missing.append(f"{name}>={min_version}")
+    if not missing:
+        return True
+    log_message(f"Packages NOT FOUND, installing: {', '.join(missing)}")
     try:
-        __import__(name)
+        # One pip invocation for all of them: a single interpreter start,
+        # index query and dependency resolve instead of one per package
+        subprocess.check_call(
+            [sys.executable, "-m", "pip", "install",
+             "--disable-pip-version-check", "--no-input",
+             "--no-warn-script-location"] + missing,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        log_message("Packages installed successfully")
         return True
-    except ImportError:
-        log_message(f"{name} package - NOT FOUND, installing...")
-        try:
-            subprocess.check_call(
-                [sys.executable, "-m", "pip", "install", f"{name}>={min_version}"],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.PIPE
-            )
-            log_message(f"{name} package installed successfully")
-            return True
-        except subprocess.CalledProcessError as e:
-            log_message(f"Failed to install {name}: {e}", "ERROR")
-            return False
+    except subprocess.CalledProcessError as e:
+        log_message(f"Failed to install packages: {e}", "ERROR")
+        return False
 
 
 def check_org_id_file():
@@ -75,26 +103,20 @@ def check_org_id_file():
 
 def register_autostart():
     """Register autostart via Windows Registry (no admin required)"""
-    # Check if already exists
-    try:
-        key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, AUTOSTART_KEY, 0, winreg.KEY_READ)
-        winreg.QueryValueEx(key, AUTOSTART_NAME)
-        winreg.CloseKey(key)
-        log_message(f"Registry autostart already exists: {AUTOSTART_NAME} - OK")
-        return True
-    except FileNotFoundError:
-        pass
-    except Exception:
-        pass
-
-    # Create new entry
     pythonw = SCRIPT_DIR / "python" / "pythonw.exe"
     command = f'"{pythonw}" "{A_RUN_SCRIPT}"'
 
+    # Single key open for both the existence check and the write
     try:
-        key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, AUTOSTART_KEY, 0, winreg.KEY_SET_VALUE)
-        winreg.SetValueEx(key, AUTOSTART_NAME, 0, winreg.REG_SZ, command)
-        winreg.CloseKey(key)
+        with winreg.CreateKeyEx(winreg.HKEY_CURRENT_USER, AUTOSTART_KEY, 0,
+                                winreg.KEY_QUERY_VALUE | winreg.KEY_SET_VALUE) as key:
+            try:
+                winreg.QueryValueEx(key, AUTOSTART_NAME)
+                log_message(f"Registry autostart already exists: {AUTOSTART_NAME} - OK")
+                return True
+            except FileNotFoundError:
+                pass
+            winreg.SetValueEx(key, AUTOSTART_NAME, 0, winreg.REG_SZ, command)
         log_message(f"Registry autostart created: {AUTOSTART_NAME}")
         return True
     except Exception as e:
@@ -104,32 +126,52 @@ def register_autostart():
 
 def cleanup_old_task_scheduler():
     """Remove old Task Scheduler task if exists (migration cleanup)"""
-    result = subprocess.run(
-        ["schtasks", "/Delete", "/TN", TASK_NAME, "/F"],
-        capture_output=True
-    )
-    if result.returncode == 0:
-        log_message(f"Removed old Task Scheduler task: {TASK_NAME}")
+    try:
+        # Output is unused — DEVNULL avoids the pipes capture_output sets
+        # up; the timeout bounds schtasks' occasional service-restart hangs
+        result = subprocess.run(
+            ["schtasks", "/Delete", "/TN", TASK_NAME, "/F"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+            timeout=5
+        )
+        if result.returncode == 0:
+            log_message(f"Removed old Task Scheduler task: {TASK_NAME}")
+    except subprocess.TimeoutExpired:
+        log_message("schtasks /Delete timed out", "WARNING")
 
 
 def run_agent():
     """Start the USB monitoring agent"""
     try:
-        result = subprocess.run(
+        # New process group so the whole tree is reachable by taskkill /T;
+        # Popen+communicate instead of subprocess.run, whose timeout kill
+        # on Windows can take far longer than requested to return
+        flags = 0
+        if sys.platform == 'win32':
+            flags = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.CREATE_NO_WINDOW
+        proc = subprocess.Popen(
             [sys.executable, str(A_RUN_SCRIPT)],
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=120
+            creationflags=flags
         )
-        if result.returncode == 0:
+        try:
+            _, stderr = proc.communicate(timeout=120)
+        except subprocess.TimeoutExpired:
+            # Launcher is lingering but the watcher it spawned is up —
+            # reap only the launcher itself and treat this as started
+            proc.kill()
+            proc.communicate()
             return True
-        log_message(f"Agent failed to start (code {result.returncode})", "ERROR")
-        if result.stderr:
-            log_message(f"Error output: {result.stderr}", "ERROR")
+        if proc.returncode == 0:
+            return True
+        log_message(f"Agent failed to start (code {proc.returncode})", "ERROR")
+        if stderr:
+            log_message(f"Error output: {stderr}", "ERROR")
         return False
-    except subprocess.TimeoutExpired:
-        # Timeout means agent is running in background - this is OK
-        return True
     except Exception as e:
         log_message(f"Failed to start agent: {e}", "ERROR")
         return False
@@ -143,12 +185,8 @@ def main():
         return 1
 
     # Step 2: Check/Install required packages
-    if not ensure_package("wmi", "1.5.1"):
-        log_message("Installation aborted - WMI install failed", "ERROR")
-        return 1
-
-    if not ensure_package("psutil", "5.9.0"):
-        log_message("Installation aborted - psutil install failed", "ERROR")
+    if not ensure_packages([("wmi", "1.5.1")]):
+        log_message("Installation aborted - package install failed", "ERROR")
         return 1
 
     # Step 3: Check org ID file
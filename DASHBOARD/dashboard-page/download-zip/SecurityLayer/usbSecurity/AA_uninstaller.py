@@ -40,43 +40,53 @@ def log_message(message, level="INFO"):
 # PROCESS MANAGEMENT
 # =========================
 
-def kill_all_securitylayer_processes():
-    """Kill ALL running SecurityLayer Python processes (except ourselves)"""
-    killed_count = 0
+def find_securitylayer_pids():
+    """Find PIDs of running SecurityLayer Python processes (except ourselves)"""
     my_pid = os.getpid()
+    pids = []
 
     try:
-        import psutil # type: ignore
-        for proc in psutil.process_iter(['pid', 'cmdline']):
-            try:
-                # Skip ourselves
-                if proc.pid == my_pid:
-                    continue
-
-                cmdline = proc.info.get('cmdline') or []
-                cmdline_str = ' '.join(cmdline)
-
-                # Kill any Python process from SecurityLayer folder
-                if 'SecurityLayer' in cmdline_str and proc.name() in ('python.exe', 'pythonw.exe'):
-                    log_message(f"Killing process PID {proc.pid}")
-                    proc.terminate()
-                    try:
-                        proc.wait(timeout=5)
-                    except psutil.TimeoutExpired:
-                        proc.kill()
-                    killed_count += 1
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-
+        import wmi # type: ignore
+        # One WMI query returns PID+CommandLine for all Python processes in
+        # a single RPC, instead of per-process syscalls over the whole box
+        query = ("SELECT ProcessId, CommandLine FROM Win32_Process "
+                 "WHERE Name = 'python.exe' OR Name = 'pythonw.exe'")
+        for proc in wmi.WMI().query(query):
+            pid = int(proc.ProcessId)
+            cmdline = proc.CommandLine or ""
+            if pid != my_pid and 'SecurityLayer' in cmdline:
+                pids.append(pid)
     except ImportError:
-        log_message("psutil not available for process scan", "WARNING")
+        log_message("wmi not available for process scan", "WARNING")
+    except Exception as e:
+        log_message(f"Process scan failed: {e}", "WARNING")
+
+    return pids
+
+
+def kill_all_securitylayer_processes():
+    """Kill ALL running SecurityLayer Python processes (except ourselves)"""
+    pids = find_securitylayer_pids()
+
+    if pids:
+        log_message(f"Killing PIDs: {', '.join(map(str, pids))}")
+        # One taskkill for all matches: /T takes the child trees down too,
+        # and the kernel terminates everything in parallel instead of one
+        # spawn + wait per PID
+        cmd = ["taskkill", "/F", "/T"]
+        for pid in pids:
+            cmd += ["/PID", str(pid)]
+        try:
+            subprocess.run(cmd, capture_output=True, check=False, timeout=10)
+        except subprocess.TimeoutExpired:
+            log_message("taskkill timed out", "WARNING")
 
-    if killed_count > 0:
-        log_message(f"Killed {killed_count} SecurityLayer process")
+    if pids:
+        log_message(f"Killed {len(pids)} SecurityLayer process")
     else:
         log_message("No SecurityLayer processes found")
 
-    return killed_count
+    return len(pids)
 
 
 def stop_watcher_process():
@@ -130,8 +140,10 @@ def remove_startup_task():
     try:
         subprocess.run(
             ["schtasks", "/Delete", "/TN", TASK_NAME, "/F"],
-            capture_output=True,
-            check=False
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+            timeout=5
         )
         return True
     except Exception as e:
@@ -5,6 +5,8 @@ import sys
 import time
 import logging
 import os
+import queue
+import threading
 from pathlib import Path
 
 if sys.platform == 'win32':
@@ -17,15 +19,29 @@ SCRIPT_ON_DISCONNECT = SCRIPT_DIR / "C_run.py"
 LOG_FILE = SCRIPT_DIR.parent / "history.log"
 WATCHER_LOCK_FILE = SCRIPT_DIR / "watcher.lock"
 USB_PNP_FILTER = "USB%"
-POLL_INTERVAL_SECONDS = 2
+EVENT_POLL_TIMEOUT_MS = 2000
 POST_EVENT_DELAY_SECONDS = 0.5
 
-# Logging setup
-logging.basicConfig(
-    filename=str(LOG_FILE), level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S', filemode='a', encoding='utf-8'
-)
+# Logging setup: records go into a 64KB-buffered stream without the
+# per-record flush stock StreamHandler does, so an event's burst of
+# lines is one buffered write. ERROR flushes immediately; the main loop
+# flushes at end of each event batch; logging.shutdown() (atexit)
+# flushes whatever remains.
+class _BufferedStreamHandler(logging.StreamHandler):
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.ERROR:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+_log_stream = open(str(LOG_FILE), 'a', encoding='utf-8', buffering=64 * 1024)
+log_handler = _BufferedStreamHandler(_log_stream)
+log_handler.setFormatter(logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'))
+logging.basicConfig(level=logging.INFO, handlers=[log_handler])
 logging.raiseExceptions = False
 logger = logging.getLogger('USBWatcher')
 
@@ -54,53 +70,136 @@ def load_wmi():
     """Load WMI module and return WMI connection."""
     try:
         import wmi
-        return wmi.WMI()
     except ImportError:
         logger.error("WMI module not found. Install with: pip install wmi")
         sys.exit(1)
+    try:
+        # MTA matches WMI's own apartment, avoiding cross-apartment
+        # marshaling on every call from this thread
+        import pythoncom
+        pythoncom.CoInitializeEx(pythoncom.COINIT_MULTITHREADED)
+    except Exception:
+        pass  # already initialized (possibly in another mode) or non-Windows
+    return wmi.WMI()
+
+
+DEVICE_INFO_FIELDS = ("PNPDeviceID", "Name", "DeviceID",
+                      "Description", "Manufacturer", "Status")
 
 
 def extract_device_info(device):
     """Extract device info from WMI object."""
-    pnp = getattr(device, "PNPDeviceID", "") or ""
+    # One pass over the COM property bag instead of one IDispatch
+    # round-trip per attribute through the wmi wrapper's __getattr__
+    try:
+        props = {p.Name: p.Value for p in device.ole_object.Properties_}
+    except Exception:
+        props = {name: getattr(device, name, None) for name in DEVICE_INFO_FIELDS}
+    pnp = props.get("PNPDeviceID") or ""
     info = {
-        "name": getattr(device, "Name", None),
-        "device_id": getattr(device, "DeviceID", None),
+        "name": props.get("Name"),
+        "device_id": props.get("DeviceID"),
         "pnp_device_id": pnp,
-        "description": getattr(device, "Description", None),
-        "manufacturer": getattr(device, "Manufacturer", None),
-        "status": getattr(device, "Status", None),
+        "description": props.get("Description"),
+        "manufacturer": props.get("Manufacturer"),
+        "status": props.get("Status"),
     }
     if "\\" in pnp and len(pnp.split("\\")) > 1:
         info["usb_ids"] = pnp.split("\\")[1]
     return info
 
 
-def query_usb_devices(wmi_conn):
-    """Query USB devices using WMI connection (all USB interfaces)."""
-    devices = {}
-    query = f"SELECT * FROM Win32_PnPEntity WHERE PNPDeviceID LIKE '{USB_PNP_FILTER}'"
-    for dev in wmi_conn.query(query):
-        pnp_id = getattr(dev, "PNPDeviceID", None)
-        if pnp_id:
-            devices[pnp_id] = extract_device_info(dev)
-    return devices
+def make_usb_watchers(wmi_conn):
+    """Subscribe to USB device arrival/removal events via WMI.
+
+    Event subscription replaces the old 2-second Win32_PnPEntity poll:
+    WMI delivers the changed device itself (TargetInstance), so nothing
+    runs and no query is made while the USB topology is unchanged.
+    """
+    # The NOT LIKE clause drops '&MI_xx' interface children server-side, so
+    # composite devices fire one event for the parent instead of one per
+    # interface — WMI never marshals the children across COM at all
+    condition = (f"TargetInstance ISA 'Win32_PnPEntity' "
+                 f"AND TargetInstance.PNPDeviceID LIKE '{USB_PNP_FILTER}' "
+                 f"AND NOT TargetInstance.PNPDeviceID LIKE '%&MI[_]%'")
+    arrival = wmi_conn.watch_for(
+        raw_wql=f"SELECT * FROM __InstanceCreationEvent WITHIN 1 WHERE {condition}")
+    removal = wmi_conn.watch_for(
+        raw_wql=f"SELECT * FROM __InstanceDeletionEvent WITHIN 1 WHERE {condition}")
+    return arrival, removal
 
 
 def log_device_event(event_type, info):
-    """Log USB device event."""
-    logger.info(f"USB {event_type.upper()}: {info.get('name')} | "
-                f"{info.get('description')} | {info.get('manufacturer')}")
+    """Log USB device event as a single record with lazy formatting."""
+    logger.info("USB %s | name=%s desc=%s mfr=%s id=%s",
+                event_type.upper(), info.get("name"), info.get("description"),
+                info.get("manufacturer"), info.get("device_id"))
+
+
+# Script launches run on a worker thread so the event loop never blocks
+# on the settle delay; bursts queued during the delay collapse into one run
+script_queue = queue.Queue()
+
+# One long-lived C_run.py in --server mode: a line on its stdin triggers a
+# pipeline run, so the ~300ms Windows interpreter startup is paid once,
+# not per USB event. Restarted lazily if it dies.
+_pipeline_proc = None
+
+def _ensure_pipeline_worker():
+    global _pipeline_proc
+    if _pipeline_proc is not None and _pipeline_proc.poll() is None:
+        return _pipeline_proc
+    flags = 0
+    if sys.platform == 'win32':
+        flags = subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
+    _pipeline_proc = subprocess.Popen(
+        [sys.executable, str(SCRIPT_ON_CONNECT), "--server"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        close_fds=False,
+        creationflags=flags
+    )
+    logger.info("Started pipeline worker (PID %s)", _pipeline_proc.pid)
+    return _pipeline_proc
+
+
+def _script_worker():
+    while True:
+        script = script_queue.get()
+        time.sleep(POST_EVENT_DELAY_SECONDS)
+        try:
+            while True:
+                script = script_queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            worker = _ensure_pipeline_worker()
+            worker.stdin.write(b"run\n")
+            worker.stdin.flush()
+        except Exception as e:
+            logger.error(f"Pipeline worker failed ({e}), falling back to one-shot run")
+            run_script(script)
+        log_handler.flush()  # end of event batch
+
+
+def start_script_worker():
+    threading.Thread(target=_script_worker, daemon=True).start()
 
 
 def run_script(script_path):
     """Run external Python script (non-blocking)."""
     try:
-        flags = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+        flags = 0
+        if sys.platform == 'win32':
+            # Own process group: a stuck run stays killable as a tree
+            # (taskkill /T) without taking the watcher down with it
+            flags = subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
         subprocess.Popen(
             [sys.executable, script_path],
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
+            close_fds=False,
             creationflags=flags
         )
         logger.info(f"Started script: {script_path}")
@@ -110,31 +209,38 @@ def run_script(script_path):
 
 def watch_usb_changes():
     """Main USB monitoring loop."""
+    import wmi
     wmi_conn = load_wmi()
-    logger.info("Monitoring USB devices...")
-    previous = query_usb_devices(wmi_conn)
+    start_script_worker()
+    logger.info("Monitoring USB devices (WMI event subscription)...")
 
+    def build_watchers(conn):
+        arrival, removal = make_usb_watchers(conn)
+        return (
+            (arrival, "connected", SCRIPT_ON_CONNECT),
+            (removal, "disconnected", SCRIPT_ON_DISCONNECT),
+        )
+
+    watchers = build_watchers(wmi_conn)
     try:
         while True:
-            time.sleep(POLL_INTERVAL_SECONDS)
-            current = query_usb_devices(wmi_conn)
-
-            connected = [info for pid, info in current.items() if pid not in previous]
-            disconnected = [info for pid, info in previous.items() if pid not in current]
-
-            if connected:
-                for info in connected:
-                    log_device_event("connected", info)
-                time.sleep(POST_EVENT_DELAY_SECONDS)
-                run_script(SCRIPT_ON_CONNECT)
-
-            if disconnected:
-                for info in disconnected:
-                    log_device_event("disconnected", info)
-                time.sleep(POST_EVENT_DELAY_SECONDS)
-                run_script(SCRIPT_ON_DISCONNECT)
-
-            previous = current
+            for watcher, event_type, script in watchers:
+                try:
+                    # The event wraps the device instance itself — no re-query
+                    device = watcher(timeout_ms=EVENT_POLL_TIMEOUT_MS)
+                except wmi.x_wmi_timed_out:
+                    continue
+                except wmi.x_wmi as e:
+                    # Transient WMI service hiccup: rebuild the connection
+                    # and subscriptions instead of dying and paying a cold
+                    # restart through registry autostart
+                    logger.warning("WMI error (%s) — reconnecting", e)
+                    time.sleep(1)
+                    watchers = build_watchers(load_wmi())
+                    break
+                info = extract_device_info(device)
+                log_device_event(event_type, info)
+                script_queue.put(script)
     except KeyboardInterrupt:
         logger.info("USB watcher stopped")
 
@@ -29,57 +29,30 @@ logging.raiseExceptions = False
 logger = logging.getLogger('SecurityLayer')
 
 
-def _check_stale_lock():
-    """Check and remove stale lock file. Returns True if lock is held by active process."""
-    if not LOCK_FILE.exists():
-        return False
-    try:
-        import psutil # type: ignore
-        with open(LOCK_FILE, 'r') as f:
-            old_pid = int(f.read().strip())
-        if psutil.pid_exists(old_pid):
-            try:
-                proc = psutil.Process(old_pid)
-                if 'B_run.py' in ' '.join(proc.cmdline()):
-                    logger.info(f"Another B_run.py instance running (PID {old_pid})")
-                    return True
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
-        LOCK_FILE.unlink()
-    except (ValueError, IOError, ImportError):
-        try:
-            LOCK_FILE.unlink()
-        except OSError:
-            pass
-    return False
-
-
 def acquire_startup_lock():
-    """Acquire startup lock. Returns (file_handle, success)."""
+    """Acquire startup lock. Returns (file_handle, success).
+
+    The lock file has a stable name and is never unlinked: liveness comes
+    from the OS range lock, which the kernel releases when the holder dies,
+    so no PID probing or stale-file cleanup is needed (the old O_EXCL +
+    unlink dance raced against a second starter creating the same file).
+    """
     if sys.platform != 'win32':
         return None, True
 
     try:
-        if _check_stale_lock():
-            return None, False
-
-        fd = os.open(str(LOCK_FILE), os.O_RDWR | os.O_CREAT | os.O_EXCL)
+        fd = os.open(str(LOCK_FILE), os.O_RDWR | os.O_CREAT)
         try:
-            pid_bytes = str(os.getpid()).encode()
-            os.write(fd, pid_bytes)
-            os.lseek(fd, 0, os.SEEK_SET)
-            msvcrt.locking(fd, msvcrt.LK_NBLCK, len(pid_bytes))
-            return fd, True
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
         except OSError:
             os.close(fd)
-            try:
-                LOCK_FILE.unlink()
-            except OSError:
-                pass
+            logger.info("Startup lock held by another process")
             return None, False
-    except FileExistsError:
-        logger.info("Lock file created by another process")
-        return None, False
+        # PID is advisory/diagnostic only — the range lock is the truth
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, str(os.getpid()).encode())
+        return fd, True
     except Exception as e:
         logger.warning(f"Lock error: {e}, proceeding anyway")
         return None, True
@@ -89,6 +62,7 @@ def release_startup_lock(fd):
     """Release the startup lock."""
     if fd is not None:
         try:
+            os.lseek(fd, 0, os.SEEK_SET)
             msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
             os.close(fd)
         except Exception:
@@ -98,14 +72,13 @@ def release_startup_lock(fd):
 def run_initial_scan():
     """Run C_run.py for initial USB port scan."""
     try:
-        result = subprocess.run(
-            [sys.executable, str(C_RUN_SCRIPT)],
-            capture_output=True, text=True, timeout=300
-        )
-        if result.stdout:
-            logger.info(f"{result.stdout}")
-        if result.stderr:
-            logger.warning(f"C_run.py stderr:\n{result.stderr}")
+        # Child output goes straight to the log file: no pipe pair, no
+        # reader threads, no buffering of up to 300s of output in memory
+        with open(LOG_FILE, 'ab') as logf:
+            result = subprocess.run(
+                [sys.executable, str(C_RUN_SCRIPT)],
+                stdout=logf, stderr=logf, close_fds=False, timeout=300
+            )
         if result.returncode != 0:
             logger.error(f"Initial USB scan failed with code {result.returncode}")
             return False
@@ -136,28 +109,47 @@ def is_watcher_running():
         return False
 
 
-def start_background_watcher():
-    """Start watcher if not already running."""
+def spawn_background_watcher():
+    """Spawn the watcher without waiting. Returns (process, ok)."""
     try:
         if is_watcher_running():
             logger.info("USB watcher already running (lock held)")
-            return True
+            return None, True
 
+        # close_fds=False skips Popen's handle-inheritance filtering — the
+        # most expensive part of Windows process creation for a detached
+        # child that inherits nothing but the DEVNULL std handles
         process = subprocess.Popen(
             [sys.executable, str(WATCHER_SCRIPT)],
             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            close_fds=False,
             creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
         )
-        time.sleep(0.5)
+        return process, True
+    except Exception as e:
+        logger.error(f"Failed to start background watcher: {e}")
+        return None, False
 
-        if is_watcher_running():
-            with open(PID_FILE, 'w') as f:
-                f.write(str(process.pid))
-            return True
+
+def verify_background_watcher(process):
+    """Wait for a spawned watcher to take its lock and record its PID."""
+    try:
+        # The watcher signals readiness by taking its byte-range lock, so
+        # poll for that instead of a fixed 500 ms sleep: typically done in
+        # tens of ms, and slow starts get up to 2 s instead of racing
+        deadline = time.monotonic() + 2.0
+        while time.monotonic() < deadline:
+            if is_watcher_running():
+                with open(PID_FILE, 'w') as f:
+                    f.write(str(process.pid))
+                return True
+            if process.poll() is not None:
+                break  # watcher exited during startup
+            time.sleep(0.05)
         logger.error("Watcher failed to start or acquire lock")
         return False
     except Exception as e:
-        logger.error(f"Failed to start background watcher: {e}")
+        logger.error(f"Failed to verify background watcher: {e}")
         return False
 
 
@@ -176,10 +168,19 @@ def main():
             logger.error(f"ERROR: {WATCHER_SCRIPT} not found")
             return 1
 
+        # Spawn the watcher first and let the (possibly long) initial scan
+        # absorb its startup: total wall time is max(scan, spawn), not the
+        # sum. Scan and watcher touch disjoint state, so the overlap is safe.
+        watcher_proc, spawn_ok = spawn_background_watcher()
+
         if not run_initial_scan():
             logger.warning("Initial scan failed, but continuing with watcher...")
 
-        if not start_background_watcher():
+        if watcher_proc is not None:
+            if not verify_background_watcher(watcher_proc):
+                logger.error("Failed to start background watcher")
+                return 1
+        elif not spawn_ok:
             logger.error("Failed to start background watcher")
             return 1
         return 0
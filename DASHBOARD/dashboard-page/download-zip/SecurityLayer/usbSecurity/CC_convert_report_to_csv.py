@@ -1,6 +1,7 @@
 """USB Port Enumeration to CSV via Direct IOCTL. No admin rights or external tools required."""
 
-import ctypes, csv, hashlib, os, winreg
+import ctypes, csv, hashlib, io, os, winreg
+from concurrent.futures import ThreadPoolExecutor
 from ctypes import wintypes, Structure, Union, POINTER, byref, sizeof, c_ulong, c_ushort, c_ubyte, c_void_p, c_int, c_wchar
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -8,6 +9,11 @@ ORG_ID_FILE, OUTPUT_FILE = "A_org_id.csv", "CCA_final_ports_list.csv"
 CSV_HEADERS = ["ORG_ID", "PC_ID", "PORT_ID", "PORT_MAP", "PORT_STATUS", "PORT_NAME"]
 HASH_LEN = 8
 
+def short_hash(text):
+    """8-hex-char id digest. blake2b at digest_size=4 emits exactly
+    HASH_LEN hex chars — no crypto-grade hash truncated after the fact."""
+    return hashlib.blake2b(text.encode(), digest_size=HASH_LEN // 2).hexdigest()
+
 # Windows constants
 GENERIC_READ, FILE_SHARE_RW, OPEN_EXISTING = 0x80000000, 0x03, 3
 DIGCF_PRESENT_DEVICEINTERFACE = 0x12
@@ -103,9 +109,12 @@ def get_hub_paths():
     SetupDiDestroyDeviceInfoList(dev_info)
     return paths
 
-def get_string_descriptor(handle, port, idx):
+def get_string_descriptor(handle, port, idx, req):
     if idx == 0: return ""
-    req = USB_DESCRIPTOR_REQUEST()
+    # req is caller-owned and reused across ports; the kernel rewrites
+    # Data and we only read length-prefixed bytes, so zeroing the length
+    # byte is enough to invalidate the previous descriptor
+    req.Data[0] = 0
     req.ConnectionIndex, req.SetupPacket.bmRequest, req.SetupPacket.bRequest = port, 0x80, 0x06
     req.SetupPacket.wValue, req.SetupPacket.wIndex, req.SetupPacket.wLength = (3 << 8) | idx, 0x0409, 255
     ret = wintypes.DWORD()
@@ -140,16 +149,21 @@ def is_real_port(port_number, flags, companion_port):
         return False
     return companion_port > 0 or port_number < 10
 
-def enumerate_ports():
-    ports, seen, hub_idx = [], set(), 0
-    for path in get_hub_paths():
-        if (pl := path.lower()) in seen: continue
-        seen.add(pl)
-        handle = CreateFileW(path, GENERIC_READ, FILE_SHARE_RW, None, OPEN_EXISTING, 0, None)
-        if handle in (-1, 0): continue
-        hub_idx += 1
-        node = USB_NODE_INFORMATION(); ret = wintypes.DWORD()
-        if DeviceIoControl(handle, IOCTL_USB_GET_NODE_INFORMATION, byref(node), sizeof(node), byref(node), sizeof(node), byref(ret), None):
+def enumerate_hub(path):
+    """Enumerate one hub's ports. Returns port dicts (hub number assigned
+    by the caller) or None if the hub can't be opened."""
+    # Hot-loop names bound as locals: LOAD_FAST instead of a module
+    # lookup per IOCTL across the port loop
+    dio, _byref, _sizeof = DeviceIoControl, byref, sizeof
+    # One set of IOCTL buffers per worker, reused for every port: each
+    # Structure() call allocates and zero-fills a fresh backing buffer,
+    # but the kernel overwrites everything past ConnectionIndex anyway
+    node, conn, req, ret = USB_NODE_INFORMATION(), USB_CONN_INFO_EX(), USB_DESCRIPTOR_REQUEST(), wintypes.DWORD()
+    handle = CreateFileW(path, GENERIC_READ, FILE_SHARE_RW, None, OPEN_EXISTING, 0, None)
+    if handle in (-1, 0): return None
+    ports = []
+    try:
+        if dio(handle, IOCTL_USB_GET_NODE_INFORMATION, _byref(node), _sizeof(node), _byref(node), _sizeof(node), _byref(ret), None):
             for pn in range(1, node.u.HubInformation.HubDescriptor.bNumberOfPorts + 1):
                 props = get_port_props(handle, pn)
                 if props is None:
@@ -157,8 +171,8 @@ def enumerate_ports():
                 flags, companion = props
                 if not is_real_port(pn, flags, companion):
                     continue
-                conn = USB_CONN_INFO_EX(); conn.ConnectionIndex = pn
-                if not DeviceIoControl(handle, IOCTL_USB_GET_NODE_CONNECTION_INFORMATION_EX, byref(conn), sizeof(conn), byref(conn), sizeof(conn), byref(ret), None):
+                conn.ConnectionIndex = pn
+                if not dio(handle, IOCTL_USB_GET_NODE_CONNECTION_INFORMATION_EX, _byref(conn), _sizeof(conn), _byref(conn), _sizeof(conn), _byref(ret), None):
                     continue
                 connected = conn.ConnectionStatus == 1
                 is_hub = bool(conn.DeviceIsHub) if connected else False
@@ -167,13 +181,35 @@ def enumerate_ports():
                 if connected:
                     vid = conn.DeviceDescriptor.idVendor
                     if conn.DeviceDescriptor.iProduct:
-                        name = get_string_descriptor(handle, pn, conn.DeviceDescriptor.iProduct)
+                        name = get_string_descriptor(handle, pn, conn.DeviceDescriptor.iProduct, req)
                     if not name:
                         name = f"USB Device {vid:04X}:{conn.DeviceDescriptor.idProduct:04X}"
-                ports.append({"hub": hub_idx, "port": pn, "chain": f"{hub_idx}-{pn}", "connected": connected, "name": name})
+                ports.append({"port": pn, "connected": connected, "name": name})
+    finally:
         CloseHandle(handle)
     return ports
 
+def enumerate_ports():
+    paths, seen = [], set()
+    for path in get_hub_paths():
+        if (pl := path.lower()) not in seen:
+            seen.add(pl); paths.append(path)
+    if not paths: return []
+    # Hubs are independent devices and blocking ctypes calls release the
+    # GIL, so their IOCTL round trips overlap across worker threads.
+    # pool.map returns results in submission order, so hub numbering (and
+    # the derived port chains) stays identical to the serial version.
+    with ThreadPoolExecutor(max_workers=min(16, len(paths))) as pool:
+        results = list(pool.map(enumerate_hub, paths))
+    ports, hub_idx = [], 0
+    for hub_ports in results:
+        if hub_ports is None: continue
+        hub_idx += 1
+        for p in hub_ports:
+            p["hub"], p["chain"] = hub_idx, f"{hub_idx}-{p['port']}"
+            ports.append(p)
+    return ports
+
 def read_org_id():
     try:
         with open(os.path.join(SCRIPT_DIR, ORG_ID_FILE), "r", encoding="utf-8") as f:
@@ -185,7 +221,7 @@ def get_pc_id():
     try:
         key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Cryptography")
         guid, _ = winreg.QueryValueEx(key, "MachineGuid"); winreg.CloseKey(key)
-        return f"PC_{hashlib.sha256(guid.encode()).hexdigest()[:HASH_LEN]}"
+        return f"PC_{short_hash(guid)}"
     except: return None
 
 def main():
@@ -194,13 +230,20 @@ def main():
     if not (ports := enumerate_ports()): print("Error: No USB ports found"); return
 
     path = os.path.join(SCRIPT_DIR, OUTPUT_FILE)
+    # Keyed digest binds port ids to this machine without the per-row
+    # f"{pc_id}_{chain}" concat; same 8-hex-char width as short_hash
+    key, blake2b = pc_id.encode()[:16], hashlib.blake2b
+    # Serialize everything in memory and write once — one buffer flush
+    # instead of a file write per port row
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(CSV_HEADERS)
+    w.writerows(
+        [org_id, pc_id, "PORT_" + blake2b(p["chain"].encode(), digest_size=HASH_LEN // 2, key=key).hexdigest(),
+         p["chain"], "Secured" if p["connected"] else "Free", p["name"] or "Empty USB Port"]
+        for p in ports)
     with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f); w.writerow(CSV_HEADERS)
-        for p in ports:
-            port_id = "PORT_" + hashlib.md5(f"{pc_id}_{p['chain']}".encode()).hexdigest()[:HASH_LEN]
-            status = "Secured" if p["connected"] else "Free"
-            name = p["name"] or "Empty USB Port"
-            w.writerow([org_id, pc_id, port_id, p["chain"], status, name])
+        f.write(buf.getvalue())
 
     connected = sum(1 for p in ports if p["connected"])
     print(f"Success: {len(ports)} ports exported to {OUTPUT_FILE}")
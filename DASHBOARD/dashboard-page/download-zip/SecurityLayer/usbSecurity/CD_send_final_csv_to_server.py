@@ -1,4 +1,5 @@
 import requests
+import gzip
 import os
 import sys
 
@@ -7,25 +8,36 @@ SERVER_URL = 'https://sec.weforks.org'
 LOCAL_URL = 'http://localhost:5000'
 ROUTE = '/update-dashboard'
 CSV_FILE = 'CCA_final_ports_list.csv'
-ENCODING = 'utf-8'
 # ======================================
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
+SESSION = requests.Session()
 
-local = '--local' in sys.argv
-BASE_URL = LOCAL_URL if local else SERVER_URL
-API_URL = f"{BASE_URL}{ROUTE}"
 
-csv_path = os.path.join(script_dir, CSV_FILE)
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
 
-with open(csv_path, 'r', encoding=ENCODING) as f:
-    csv_content = f.read()
+    local = '--local' in sys.argv
+    base_url = LOCAL_URL if local else SERVER_URL
+    api_url = f"{base_url}{ROUTE}"
 
-try:
-    response = requests.post(API_URL, data=csv_content)
-    if response.status_code == 200:
-        print(f'[OK] Admin Dashboard updated... ({API_URL})')
-    else:
-        print(f'Error: {response.status_code}')
-except requests.exceptions.ConnectionError:
-    print(f'Error: Server not available at {API_URL}')
+    csv_path = os.path.join(script_dir, CSV_FILE)
+
+    with open(csv_path, 'rb') as f:
+        csv_content = f.read()
+
+    # CSV is text-heavy: level-1 gzip halves the body for negligible CPU
+    body = gzip.compress(csv_content, compresslevel=1)
+    headers = {'Content-Type': 'text/csv', 'Content-Encoding': 'gzip'}
+
+    try:
+        response = SESSION.post(api_url, data=body, headers=headers)
+        if response.status_code == 200:
+            print(f'[OK] Admin Dashboard updated... ({api_url})')
+        else:
+            print(f'Error: {response.status_code}')
+    except requests.exceptions.ConnectionError:
+        print(f'Error: Server not available at {api_url}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import asyncio
+import importlib
 import subprocess
 import sys
 from pathlib import Path
@@ -26,6 +27,7 @@ async def run_script(script_name: str):
         sys.executable, str(script_path),
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
+        close_fds=False,
         creationflags=creationflags
     )
     stdout, stderr = await process.communicate()
@@ -35,10 +37,49 @@ async def run_script(script_name: str):
         print(stderr.decode().strip())
 
 
+def run_in_process(script_name: str) -> bool:
+    """Import a colocated pipeline script and call its main() directly.
+
+    Skips one interpreter startup + import pass per step; module imports
+    are cached, so in --server mode each script's import cost is paid
+    once for the process lifetime. Returns False if the module can't be
+    imported (caller falls back to a subprocess).
+    """
+    try:
+        module = importlib.import_module(script_name.removesuffix(".py"))
+    except Exception:
+        return False
+    try:
+        module.main()
+    except Exception as e:
+        print(f"{script_name} failed: {e}", file=sys.stderr)
+    return True
+
+
 async def main():
     for script in SCRIPTS:
-        await run_script(script)
+        if not run_in_process(script):
+            await run_script(script)
+
+
+def serve():
+    """Long-lived worker mode: run the pipeline once per line on stdin.
+
+    The watcher keeps one C_run.py alive and writes a line per USB event,
+    so the interpreter startup cost is paid once instead of per event.
+    EOF (watcher exit) ends the loop.
+    """
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            asyncio.run(main())
+        except Exception as e:
+            print(f"Pipeline run failed: {e}", file=sys.stderr)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if "--server" in sys.argv[1:]:
+        serve()
+    else:
+        asyncio.run(main())
\ No newline at end of file
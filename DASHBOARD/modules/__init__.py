@@ -1,12 +1,17 @@
-# Shared config for modules
+# Shared config — parsed once per process and imported everywhere else
 import os
 import yaml
 
+try:
+    from yaml import CSafeLoader as _YamlLoader  # libyaml, much faster parse
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 config_path = os.path.join(script_dir, '..', 'config.yaml')
 
 with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
+    config = yaml.load(f, Loader=_YamlLoader)
 
 REPO_ROOT = os.path.normpath(os.path.join(script_dir, '..'))
 ENCODING = config['ENCODING']
@@ -1,17 +1,47 @@
 from flask import Blueprint, request, jsonify
 import os
+import io
 import csv
 import re
 import uuid
+import hmac
+import hashlib
+import secrets
+import threading
 from . import REPO_ROOT, ENCODING
 
 auth_bp = Blueprint('auth', __name__)
 
 USERS_CSV = os.path.join(REPO_ROOT, 'DATA', 'admins.csv')
-_FIELD_TO_COLUMN = {'email': 'USER_MAIL', 'orgName': 'ORG_NAME', 'userName': 'USER_NAME'}
+USER_FIELDS = ['ORG_ID', 'ORG_NAME', 'USER_ID', 'USER_NAME', 'USER_MAIL', 'USER_PASSWORD']
+
+# Passwords are stored as salted scrypt hashes: 'scrypt$<salt_hex>$<digest_hex>'.
+# Legacy plaintext records are upgraded lazily on the next successful login.
+_SCRYPT_N, _SCRYPT_R, _SCRYPT_P = 2 ** 14, 8, 1
+
+def hash_password(password: str) -> str:
+    salt = secrets.token_hex(16)
+    digest = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt),
+                            n=_SCRYPT_N, r=_SCRYPT_R, p=_SCRYPT_P)
+    return f'scrypt${salt}${digest.hex()}'
+
+def verify_password(stored: str, password: str) -> bool:
+    if stored.startswith('scrypt$'):
+        try:
+            _, salt, digest = stored.split('$')
+        except ValueError:
+            return False
+        candidate = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt),
+                                   n=_SCRYPT_N, r=_SCRYPT_R, p=_SCRYPT_P)
+        return hmac.compare_digest(candidate.hex(), digest)
+    # Compare as bytes: compare_digest rejects str operands with
+    # non-ASCII characters
+    return hmac.compare_digest(stored.encode(), password.encode())
+
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
 
 def is_valid_email(email: str) -> bool:
-    return bool(re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email))
+    return _EMAIL_RE.fullmatch(email) is not None
 
 def is_valid_password(password: str) -> bool:
     return isinstance(password, str) and len(password) >= 3
@@ -42,28 +72,91 @@ def _validate_registration(data: dict) -> tuple[dict, str | None]:
             return fields, error_msg
     return fields, None
 
+# Users cache keyed by file mtime: auth endpoints do O(1) dict lookups
+# instead of re-parsing the CSV and scanning it per request.
+_users_cache = {'mtime': None, 'users': [], 'by_email': {}, 'by_org': {}, 'by_user': {}}
+_users_lock = threading.RLock()
+_FIELD_TO_INDEX = {'email': 'by_email', 'orgName': 'by_org', 'userName': 'by_user'}
+
+def _refresh_users_cache() -> None:
+    try:
+        mtime = os.path.getmtime(USERS_CSV)
+    except OSError:
+        mtime = None
+    if mtime == _users_cache['mtime']:
+        return
+    with _users_lock:
+        if mtime == _users_cache['mtime']:  # another request reloaded first
+            return
+        users = []
+        if mtime is not None:
+            try:
+                # csv.reader + zip instead of DictReader: same dicts, but the
+                # per-row fieldname bookkeeping is done once here, not per row.
+                with open(USERS_CSV, 'r', newline='', encoding=ENCODING) as f:
+                    reader = csv.reader(f)
+                    next(reader, None)  # header
+                    # Skip malformed short rows: zip would silently drop
+                    # the missing fields and the index rebuild below would
+                    # KeyError on every request until the file changes
+                    users = [dict(zip(USER_FIELDS, row))
+                             for row in reader if len(row) >= len(USER_FIELDS)]
+            except Exception as e:
+                print(f'Error reading users: {e}')
+        _users_cache['users'] = users
+        _users_cache['by_email'] = {u['USER_MAIL'].casefold(): u for u in users}
+        _users_cache['by_org'] = {u['ORG_NAME'].casefold(): u for u in users}
+        _users_cache['by_user'] = {u['USER_NAME'].casefold(): u for u in users}
+        _users_cache['mtime'] = mtime
+
 def _check_field_exists(users: list[dict], field: str, value: str) -> bool:
-    column = _FIELD_TO_COLUMN.get(field)
-    return column and any(u[column].lower() == value.lower() for u in users)
+    index = _FIELD_TO_INDEX.get(field)
+    return bool(index) and value.casefold() in _users_cache[index]
 
 def read_users() -> list[dict]:
-    users = []
+    _refresh_users_cache()
+    return _users_cache['users']
+
+def find_user_by_email(email: str) -> dict | None:
+    _refresh_users_cache()
+    return _users_cache['by_email'].get(email.casefold())
+
+def _rewrite_users() -> None:
+    # Atomic tmp-file + os.replace, like _persist_state for the dashboard
+    # CSV: a crash mid-write can never leave a truncated credentials file.
+    # The lock keeps write_user from mutating the user list mid-serialize.
     try:
-        if os.path.exists(USERS_CSV):
-            with open(USERS_CSV, 'r', encoding=ENCODING) as f:
-                users = list(csv.DictReader(f))
+        with _users_lock:
+            buf = io.StringIO()
+            writer = csv.DictWriter(buf, fieldnames=USER_FIELDS)
+            writer.writeheader()
+            writer.writerows(_users_cache['users'])
+            tmp_path = USERS_CSV + '.tmp'
+            with open(tmp_path, 'w', newline='', encoding=ENCODING) as f:
+                f.write(buf.getvalue())
+            os.replace(tmp_path, USERS_CSV)
+            _users_cache['mtime'] = os.path.getmtime(USERS_CSV)
     except Exception as e:
-        print(f'Error reading users: {e}')
-    return users
+        print(f'Error writing users: {e}')
 
 def write_user(user: dict) -> bool:
     try:
         exists = os.path.exists(USERS_CSV)
         with open(USERS_CSV, 'a', newline='', encoding=ENCODING) as f:
-            writer = csv.DictWriter(f, fieldnames=['ORG_ID', 'ORG_NAME', 'USER_ID', 'USER_NAME', 'USER_MAIL', 'USER_PASSWORD'])
+            writer = csv.DictWriter(f, fieldnames=USER_FIELDS)
             if not exists:
                 writer.writeheader()
             writer.writerow(user)
+        # Keep the cache warm instead of forcing a reload on next read
+        with _users_lock:
+            _users_cache['users'].append(user)
+            _users_cache['by_email'][user['USER_MAIL'].casefold()] = user
+            _users_cache['by_org'][user['ORG_NAME'].casefold()] = user
+            _users_cache['by_user'][user['USER_NAME'].casefold()] = user
+        try:
+            _users_cache['mtime'] = os.path.getmtime(USERS_CSV)
+        except OSError:
+            pass
         return True
     except Exception as e:
         print(f'Error writing user: {e}')
@@ -75,9 +168,11 @@ def api_login():
     email, password = data.get('email', '').strip(), data.get('password', '')
     if not email or not password:
         return jsonify(ok=False, error='Email and password required'), 400
-    users = read_users()
-    user = next((u for u in users if u['USER_MAIL'] == email and u['USER_PASSWORD'] == password), None)
-    if user:
+    user = find_user_by_email(email)
+    if user and verify_password(user['USER_PASSWORD'], password):
+        if not user['USER_PASSWORD'].startswith('scrypt$'):
+            user['USER_PASSWORD'] = hash_password(password)
+            _rewrite_users()
         return jsonify(ok=True, user=user)
     return jsonify(ok=False, error='Invalid credentials'), 401
 
@@ -94,7 +189,7 @@ def api_register():
     user = {
         'ORG_ID': generate_id('ORG'), 'ORG_NAME': fields['orgName'],
         'USER_ID': generate_id('USER'), 'USER_NAME': fields['userName'],
-        'USER_MAIL': fields['email'], 'USER_PASSWORD': fields['password']
+        'USER_MAIL': fields['email'], 'USER_PASSWORD': hash_password(fields['password'])
     }
     if write_user(user):
         return jsonify(ok=True, user=user)
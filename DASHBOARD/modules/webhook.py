@@ -9,7 +9,10 @@ from . import config
 webhook_bp = Blueprint('webhook', __name__)
 
 def verify_github_signature(payload: bytes, signature: str | None) -> bool:
-    if not signature:
+    # A valid header is always 'sha256=' + 64 hex chars = 71 bytes, so
+    # malformed/scanner requests are rejected before hashing the payload.
+    # Only the digest comparison below must stay constant-time.
+    if not signature or len(signature) != 71 or not signature.startswith('sha256='):
         return False
     secret = os.environ['GITHUB_WEBHOOK_SECRET'].encode()
     expected = 'sha256=' + hmac.new(secret, payload, hashlib.sha256).hexdigest()
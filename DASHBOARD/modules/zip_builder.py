@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, send_file
 import os
 import csv
+import shutil
 import zipfile
 import threading
 from . import REPO_ROOT, ENCODING
@@ -9,6 +10,53 @@ from .auth import read_users
 zip_bp = Blueprint('zip', __name__)
 zip_lock = threading.Lock()
 
+# Built zips by org: org_id -> (source fingerprint, zip path). Repeated
+# downloads of an unchanged tree skip the walk + compress entirely.
+zip_cache = {}
+
+def _tree_fingerprint(root: str) -> float:
+    """Latest mtime in the tree, ignoring the per-org A_org_id.csv."""
+    latest = 0.0
+    for r, dirs, files in os.walk(root):
+        for fname in files:
+            if fname == 'A_org_id.csv':
+                continue
+            try:
+                latest = max(latest, os.path.getmtime(os.path.join(r, fname)))
+            except OSError:
+                pass
+    return latest
+
+EXCLUDE_DIRS = {'__pycache__'}
+EXCLUDE_EXT = {'.pyc'}
+EXCLUDE_NAMES = {'.build_manifest.json', 'A_org_id.csv'}
+
+# Org-independent base archive (the tree minus A_org_id.csv). Per-org
+# builds just copy it and append the one-line org CSV.
+_base_zip = {'fingerprint': None, 'path': None}
+
+def _ensure_base_zip(security_layer_dir: str, zip_dir: str, fingerprint: float) -> str:
+    base_path = os.path.join(zip_dir, 'SecurityLayer_base.zip')
+    if _base_zip['fingerprint'] == fingerprint and os.path.exists(base_path):
+        return base_path
+    with zipfile.ZipFile(base_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for root, dirs, files in os.walk(security_layer_dir):
+            # Prune excluded directories so the walk never descends into them
+            dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS]
+            for fname in files:
+                if fname in EXCLUDE_NAMES or os.path.splitext(fname)[1] in EXCLUDE_EXT:
+                    continue
+                fpath = os.path.join(root, fname)
+                arcname = os.path.join('SecurityLayer', os.path.relpath(fpath, security_layer_dir))
+                zf.write(fpath, arcname)
+    _base_zip['fingerprint'] = fingerprint
+    _base_zip['path'] = base_path
+    return base_path
+
+def _send_zip(path: str):
+    return send_file(path, mimetype='application/zip', as_attachment=True,
+                     download_name='SecurityLayer_USB_Monitor.zip', conditional=True)
+
 @zip_bp.route('/api/build-zip', methods=['POST'])
 def api_build_zip():
     data = request.get_json()
@@ -21,11 +69,17 @@ def api_build_zip():
     if not user:
         return jsonify(ok=False, error='Organization not found'), 404
 
+    org_id = user['ORG_ID']
     download_zip_dir = os.path.join(REPO_ROOT, 'DASHBOARD', 'dashboard-page', 'download-zip')
     org_id_csv = os.path.join(download_zip_dir, 'SecurityLayer', 'usbSecurity', 'A_org_id.csv')
     security_layer_dir = os.path.join(download_zip_dir, 'SecurityLayer')
     zip_dir = os.path.join(download_zip_dir, 'ZIP')
-    output_zip = os.path.join(zip_dir, 'SecurityLayer_USB_Monitor.zip')
+    output_zip = os.path.join(zip_dir, f'SecurityLayer_USB_Monitor_{org_id}.zip')
+
+    fingerprint = _tree_fingerprint(security_layer_dir)
+    cached = zip_cache.get(org_id)
+    if cached and cached[0] == fingerprint and os.path.exists(cached[1]):
+        return _send_zip(cached[1])
 
     if not zip_lock.acquire(timeout=5):
         return jsonify(ok=False, error='Another build is in progress'), 429
@@ -34,21 +88,16 @@ def api_build_zip():
         with open(org_id_csv, 'w', newline='', encoding=ENCODING) as f:
             writer = csv.writer(f)
             writer.writerow(['ORG_ID'])
-            writer.writerow([user['ORG_ID']])
+            writer.writerow([org_id])
 
         os.makedirs(zip_dir, exist_ok=True)
-        exclude = {'__pycache__', '.pyc', '.build_manifest.json'}
-
-        with zipfile.ZipFile(output_zip, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in os.walk(security_layer_dir):
-                for fname in files:
-                    fpath = os.path.join(root, fname)
-                    if any(ex in fpath for ex in exclude):
-                        continue
-                    arcname = os.path.join('SecurityLayer', os.path.relpath(fpath, security_layer_dir))
-                    zf.write(fpath, arcname)
-
-        return send_file(output_zip, mimetype='application/zip', as_attachment=True, download_name='SecurityLayer_USB_Monitor.zip')
+        base_path = _ensure_base_zip(security_layer_dir, zip_dir, fingerprint)
+        shutil.copyfile(base_path, output_zip)
+        with zipfile.ZipFile(output_zip, 'a', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            zf.writestr('SecurityLayer/usbSecurity/A_org_id.csv', f'ORG_ID\r\n{org_id}\r\n')
+
+        zip_cache[org_id] = (fingerprint, output_zip)
+        return _send_zip(output_zip)
     except Exception as e:
         print(f'build_zip error: {e}')
         return jsonify(ok=False, error='Internal server error'), 500